@@ -1,6 +1,7 @@
 from py_ecc.fields.field_elements import FQ as Field
 import py_ecc.bn128 as b
 from typing import NewType
+from functools import lru_cache
 
 primitive_root = 5
 G1Point = NewType("G1Point", tuple[b.FQ, b.FQ])
@@ -10,17 +11,53 @@ G2Point = NewType("G2Point", tuple[b.FQ2, b.FQ2])
 class Scalar(Field):
     field_modulus = b.curve_order
 
+    # py_ecc's FQ exponentiates by recursive square-and-multiply over field
+    # element objects, and inverts with an extended Euclid loop in Python.
+    # The built-in three-argument pow does both directly on the integers
+    def __pow__(self, exponent: int):
+        return type(self)(pow(self.n, exponent, self.field_modulus))
+
+    def __truediv__(self, other):
+        return type(self)(self.n * self._inv(type(self)(other).n))
+
+    def __rtruediv__(self, other):
+        return type(self)(type(self)(other).n * self._inv(self.n))
+
+    # As in py_ecc, 0 has no inverse and is mapped to 0
+    @classmethod
+    def _inv(cls, n: int) -> int:
+        return pow(n, -1, cls.field_modulus) if n else 0
+
     # Gets the first root of unity of a given group order
     @classmethod
     def root_of_unity(cls, group_order: int):
         return Scalar(5) ** ((cls.field_modulus - 1) // group_order)
 
-    # Gets the full list of roots of unity of a given group order
+    # Gets the full list of roots of unity of a given group order. The result
+    # is cached and shared between callers, so it is returned as a tuple
     @classmethod
-    def roots_of_unity(cls, group_order: int):
+    @lru_cache(maxsize=None)
+    def roots_of_unity(cls, group_order: int) -> tuple["Scalar", ...]:
         o = [Scalar(1), cls.root_of_unity(group_order)]
         while len(o) < group_order:
             o.append(o[-1] * o[1])
+        return tuple(o)
+
+    # Inverts every element of a list with a single field inversion
+    # (Montgomery's trick): 1 inversion + 3n multiplications instead of
+    # n inversions. As in _inv, zeros are skipped and map to 0
+    @classmethod
+    def batch_inverse(cls, values: list["Scalar"]):
+        modulus = cls.field_modulus
+        prefix = [1]
+        for x in values:
+            prefix.append(prefix[-1] * x.n % modulus if x.n else prefix[-1])
+        inv = pow(prefix[-1], -1, modulus)
+        o = [cls(0)] * len(values)
+        for i in reversed(range(len(values))):
+            if values[i].n:
+                o[i] = cls(prefix[i] * inv)
+                inv = inv * values[i].n % modulus
         return o
 
 
@@ -1,5 +1,6 @@
 from curve import Scalar
 from enum import Enum
+from functools import lru_cache
 
 
 class Basis(Enum):
@@ -7,6 +8,51 @@ class Basis(Enum):
     MONOMIAL = 2
 
 
+# Fast Fourier transform, used to convert between polynomial coefficients
+# and a list of evaluations at the roots of unity
+# See https://vitalik.ca/general/2019/05/12/fft.html
+def _fft(vals, modulus, roots_of_unity):
+    if len(vals) == 1:
+        return vals
+    L = _fft(vals[::2], modulus, roots_of_unity[::2])
+    R = _fft(vals[1::2], modulus, roots_of_unity[::2])
+    o = [0] * len(vals)
+    for i, (x, y) in enumerate(zip(L, R)):
+        y_times_root = y * roots_of_unity[i]
+        o[i] = (x + y_times_root) % modulus
+        o[i + len(L)] = (x - y_times_root) % modulus
+    return o
+
+
+# Twiddle factors for an FFT of the given size, as raw field integers. The
+# inverse FFT uses the same roots in reverse order. Cached, so that every FFT
+# of a given size shares one table
+@lru_cache(maxsize=None)
+def _twiddles(size: int, inv: bool) -> list[int]:
+    roots = [x.n for x in Scalar.roots_of_unity(size)]
+    if inv:
+        return [roots[0]] + roots[1:][::-1]
+    return roots
+
+
+# FFT over a list of raw field integers. The inverse is left unscaled: callers
+# multiply by 1/n themselves, usually together with some other factor
+def _fft_ints(vals: list[int], inv: bool = False) -> list[int]:
+    return _fft(vals, Scalar.field_modulus, _twiddles(len(vals), inv))
+
+
+# Multiplies the i-th value by factor * offset^i, carrying a running power
+# instead of computing offset**i for every i
+def _scale_by_powers(vals: list[int], factor: Scalar, offset: Scalar) -> list[int]:
+    modulus = Scalar.field_modulus
+    power, step = factor.n, Scalar(offset).n
+    o = []
+    for x in vals:
+        o.append(x * power % modulus)
+        power = power * step % modulus
+    return o
+
+
 class Polynomial:
     values: list[Scalar]
     basis: Basis
@@ -20,20 +66,27 @@ class Polynomial:
     def __eq__(self, other):
         return (self.basis == other.basis) and (self.values == other.values)
 
+    # As in fft, the elementwise operations work on the raw field integers,
+    # instead of going through Scalar operator dispatch. The Scalar
+    # constructor does the one reduction per value
     def __add__(self, other):
         if isinstance(other, Polynomial):
             assert len(self.values) == len(other.values)
             assert self.basis == other.basis
 
             return Polynomial(
-                [x + y for x, y in zip(self.values, other.values)],
+                [
+                    Scalar(x.n + y.n)
+                    for x, y in zip(self.values, other.values)
+                ],
                 self.basis,
             )
         else:
             assert isinstance(other, Scalar)
             if self.basis == Basis.LAGRANGE:
+                y = other.n
                 return Polynomial(
-                    [x + other for x in self.values],
+                    [Scalar(x.n + y) for x in self.values],
                     self.basis,
                 )
             else:
@@ -48,14 +101,18 @@ class Polynomial:
             assert self.basis == other.basis
 
             return Polynomial(
-                [x - y for x, y in zip(self.values, other.values)],
+                [
+                    Scalar(x.n - y.n)
+                    for x, y in zip(self.values, other.values)
+                ],
                 self.basis,
             )
         else:
             assert isinstance(other, Scalar)
             if self.basis == Basis.LAGRANGE:
+                y = other.n
                 return Polynomial(
-                    [x - other for x in self.values],
+                    [Scalar(x.n - y) for x in self.values],
                     self.basis,
                 )
             else:
@@ -72,13 +129,17 @@ class Polynomial:
             assert len(self.values) == len(other.values)
 
             return Polynomial(
-                [x * y for x, y in zip(self.values, other.values)],
+                [
+                    Scalar(x.n * y.n)
+                    for x, y in zip(self.values, other.values)
+                ],
                 self.basis,
             )
         else:
             assert isinstance(other, Scalar)
+            y = other.n
             return Polynomial(
-                [x * other for x in self.values],
+                [Scalar(x.n * y) for x in self.values],
                 self.basis,
             )
 
@@ -89,7 +150,7 @@ class Polynomial:
             assert len(self.values) == len(other.values)
 
             return Polynomial(
-                [x / y for x, y in zip(self.values, other.values)],
+                [x * y for x, y in zip(self.values, Scalar.batch_inverse(other.values))],
                 self.basis,
             )
         else:
@@ -111,37 +172,20 @@ class Polynomial:
     # Convenience method to do FFTs specifically over the subgroup over which
     # all of the proofs are operating
     def fft(self, inv=False):
-        # Fast Fourier transform, used to convert between polynomial coefficients
-        # and a list of evaluations at the roots of unity
-        # See https://vitalik.ca/general/2019/05/12/fft.html
-        def _fft(vals, modulus, roots_of_unity):
-            if len(vals) == 1:
-                return vals
-            L = _fft(vals[::2], modulus, roots_of_unity[::2])
-            R = _fft(vals[1::2], modulus, roots_of_unity[::2])
-            o = [0] * len(vals)
-            for i, (x, y) in enumerate(zip(L, R)):
-                y_times_root = y * roots_of_unity[i]
-                o[i] = (x + y_times_root) % modulus
-                o[i + len(L)] = (x - y_times_root) % modulus
-            return o
-
-        roots = [x.n for x in Scalar.roots_of_unity(len(self.values))]
-        o, nvals = Scalar.field_modulus, [x.n for x in self.values]
+        nvals = [x.n for x in self.values]
         if inv:
             assert self.basis == Basis.LAGRANGE
             # Inverse FFT
-            invlen = Scalar(1) / len(self.values)
-            reversed_roots = [roots[0]] + roots[1:][::-1]
+            invlen = (Scalar(1) / len(self.values)).n
             return Polynomial(
-                [Scalar(x) * invlen for x in _fft(nvals, o, reversed_roots)],
+                [Scalar(x * invlen) for x in _fft_ints(nvals, inv=True)],
                 Basis.MONOMIAL,
             )
         else:
             assert self.basis == Basis.MONOMIAL
             # Regular FFT
             return Polynomial(
-                [Scalar(x) for x in _fft(nvals, o, roots)], Basis.LAGRANGE
+                [Scalar(x) for x in _fft_ints(nvals)], Basis.LAGRANGE
             )
 
     def ifft(self):
@@ -156,19 +200,21 @@ class Polynomial:
     def to_coset_extended_lagrange(self, offset):
         assert self.basis == Basis.LAGRANGE
         group_order = len(self.values)
-        x_powers = self.ifft().values
-        x_powers = [(offset**i * x) for i, x in enumerate(x_powers)] + [Scalar(0)] * (
-            group_order * 3
-        )
-        return Polynomial(x_powers, Basis.MONOMIAL).fft()
+        # The 1/n of the inverse FFT is folded into the powers of the offset,
+        # so each coefficient is scaled with a single multiplication
+        x_powers = _scale_by_powers(
+            _fft_ints([x.n for x in self.values], inv=True),
+            Scalar(1) / group_order,
+            offset,
+        ) + [0] * (group_order * 3)
+        return Polynomial([Scalar(x) for x in _fft_ints(x_powers)], Basis.LAGRANGE)
 
     def coeffs_to_extended_lagrange(self, offset, group_order):
         assert self.basis == Basis.MONOMIAL
-        x_powers = self.values
-        x_powers = [(offset**i * x) for i, x in enumerate(x_powers)] + [Scalar(0)] * (
-            4 * group_order - len(x_powers)
-        )
-        return Polynomial(x_powers, Basis.MONOMIAL).fft()
+        x_powers = _scale_by_powers(
+            [x.n for x in self.values], Scalar(1), offset
+        ) + [0] * (4 * group_order - len(self.values))
+        return Polynomial([Scalar(x) for x in _fft_ints(x_powers)], Basis.LAGRANGE)
 
     # Convert from offset form into coefficients
     # Note that we can't make a full inverse function of to_coset_extended_lagrange
@@ -177,27 +223,56 @@ class Polynomial:
     def coset_extended_lagrange_to_coeffs(self, offset):
         assert self.basis == Basis.LAGRANGE
 
-        shifted_coeffs = self.ifft().values
-        inv_offset = 1 / offset
+        # As above, the 1/4n of the inverse FFT is folded into the powers of
+        # 1/offset
+        shifted_coeffs = _fft_ints([x.n for x in self.values], inv=True)
         return Polynomial(
-            [v * inv_offset**i for (i, v) in enumerate(shifted_coeffs)],
+            [
+                Scalar(x)
+                for x in _scale_by_powers(
+                    shifted_coeffs, Scalar(1) / len(self.values), Scalar(1) / offset
+                )
+            ],
             Basis.MONOMIAL,
         )
 
+    # Evaluate a polynomial given by its coefficients at x, using Horner's rule
+    def coeffs_eval(self, x: Scalar):
+        assert self.basis == Basis.MONOMIAL
+
+        o = Scalar(0)
+        for coeff in reversed(self.values):
+            o = o * x + coeff
+        return o
+
     # Given a polynomial expressed as a list of evaluations at roots of unity,
     # evaluate it at x directly, without using an FFT to covert to coeffs first
     def barycentric_eval(self, x: Scalar):
-        assert self.basis == Basis.LAGRANGE
+        return Polynomial.barycentric_eval_batch([self], x)[0]
+
+    # Evaluate several polynomials over the same roots of unity at the same x.
+    # The barycentric weights ω^i / (x - ω^i) only depend on x and the order,
+    # so they are computed once (with a single batch inversion) and every
+    # polynomial then costs one dot product
+    @staticmethod
+    def barycentric_eval_batch(polys: list["Polynomial"], x: Scalar):
+        assert len(polys) > 0
+        assert all(poly.basis == Basis.LAGRANGE for poly in polys)
 
-        order = len(self.values)
+        order = len(polys[0].values)
+        assert all(len(poly.values) == order for poly in polys)
+        x = Scalar(x)
         roots_of_unity = Scalar.roots_of_unity(order)
-        return (
-            (Scalar(x) ** order - 1)
-            / order
-            * sum(
-                [
-                    value * root / (x - root)
-                    for value, root in zip(self.values, roots_of_unity)
-                ]
-            )
-        )
+        x_order = x**order
+        # At x = ω^i the formula is 0/0, but the value is simply stored. Only
+        # points of the subgroup have x^n = 1, so only then look for i
+        if x_order == 1:
+            i = roots_of_unity.index(x)
+            return [poly.values[i] for poly in polys]
+        inv_denoms = Scalar.batch_inverse([x - root for root in roots_of_unity])
+        weights = [(root * inv).n for root, inv in zip(roots_of_unity, inv_denoms)]
+        factor = (x_order - 1) / order
+        return [
+            factor * sum(value.n * weight for value, weight in zip(poly.values, weights))
+            for poly in polys
+        ]
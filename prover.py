@@ -2,7 +2,9 @@ from compiler.program import Program, CommonPreprocessedInput
 from utils import *
 from setup import *
 from typing import Optional
+import os
 from dataclasses import dataclass
+from concurrent.futures import ProcessPoolExecutor
 from transcript import Transcript, Message1, Message2, Message3, Message4, Message5
 from poly import Polynomial, Basis
 
@@ -35,31 +37,91 @@ class Proof:
         return proof
 
 
+# Setup used by the commitment worker processes. It is installed once per
+# worker so that it isn't pickled again along with every polynomial
+_worker_setup: Optional[Setup] = None
+
+
+def _init_commit_worker(setup: Setup):
+    global _worker_setup
+    _worker_setup = setup
+
+
+def _commit_in_worker(values: Polynomial) -> G1Point:
+    assert _worker_setup is not None
+    return _worker_setup.commit(values)
+
+
 @dataclass
 class Prover:
     group_order: int
     setup: Setup
     program: Program
     pk: CommonPreprocessedInput
-
-    def __init__(self, setup: Setup, program: Program):
+    # Re-check intermediate results that are implied by the construction.
+    # Useful when working on the prover, but far too slow for every proof
+    debug: bool
+    # Roots of unity of the subgroup, and its generator ω
+    roots_of_unity: tuple[Scalar, ...]
+    ru: Scalar
+    # Number of processes to run commitments in. None picks it from the
+    # usable CPUs, and 1 commits serially in this process
+    commit_workers: Optional[int]
+    # Worker pool for the commitments of the proof in progress. Only set
+    # while prove() runs, and left as None when committing serially
+    executor: Optional[ProcessPoolExecutor]
+
+    def __init__(
+        self,
+        setup: Setup,
+        program: Program,
+        debug: bool = False,
+        commit_workers: Optional[int] = None,
+    ):
         self.group_order = program.group_order
         self.setup = setup
         self.program = program
         self.pk = program.common_preprocessed_input()
+        self.debug = debug
+        self.roots_of_unity = Scalar.roots_of_unity(self.group_order)
+        self.ru = self.roots_of_unity[1]
+        self.commit_workers = commit_workers
+        self.executor = None
 
     def prove(self, witness: dict[Optional[str], int]) -> Proof:
+        # Each commitment is an independent MSM in pure Python (py_ecc holds
+        # the GIL), so the (at most 3) commitments of a round are run in
+        # separate processes. With a single usable CPU the pool is pure
+        # overhead, so commit serially instead. The pool only lives for this
+        # proof
+        workers = self.commit_workers
+        if workers is None:
+            if hasattr(os, "sched_getaffinity"):
+                cpus = len(os.sched_getaffinity(0))
+            else:
+                cpus = os.cpu_count() or 1
+            workers = min(3, cpus)
+        if workers == 1:
+            return self.prove_rounds(witness)
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_commit_worker,
+            initargs=(self.setup,),
+        ) as executor:
+            self.executor = executor
+            try:
+                return self.prove_rounds(witness)
+            finally:
+                self.executor = None
+
+    def prove_rounds(self, witness: dict[Optional[str], int]) -> Proof:
         # Initialise Fiat-Shamir transcript
         transcript = Transcript(b"plonk")
 
         # Collect fixed and public information
         # FIXME: Hash pk and PI into transcript
         public_vars = self.program.get_public_assignments()
-        PI = Polynomial(
-            [Scalar(-witness[v]) for v in public_vars]
-            + [Scalar(0) for _ in range(self.group_order - len(public_vars))],
-            Basis.LAGRANGE,
-        )
+        PI = self.pad_lagrange([Scalar(-witness[v]) for v in public_vars])
         self.PI = PI
 
         # Round 1
@@ -88,7 +150,6 @@ class Prover:
         witness: dict[Optional[str], int],
     ) -> Message1:
         program = self.program
-        setup = self.setup
         group_order = self.group_order
 
         if None not in witness:
@@ -101,34 +162,34 @@ class Prover:
 
         # Construct A, B, C Lagrange interpolation polynomials for
         # A_values, B_values, C_values
-        self.A = Polynomial(A + [Scalar(0)] * (group_order - len(program.wires())), Basis.LAGRANGE)
-        self.B = Polynomial(B + [Scalar(0)] * (group_order - len(program.wires())), Basis.LAGRANGE)
-        self.C = Polynomial(C + [Scalar(0)] * (group_order - len(program.wires())), Basis.LAGRANGE)
+        self.A = self.pad_lagrange(A)
+        self.B = self.pad_lagrange(B)
+        self.C = self.pad_lagrange(C)
 
         # Compute a_1, b_1, c_1 commitments to A, B, C polynomials
-        a_1 = setup.commit(self.A)
-        b_1 = setup.commit(self.B)
-        c_1 = setup.commit(self.C)
+        a_1, b_1, c_1 = self.commit(self.A, self.B, self.C)
 
-        # Sanity check that witness fulfils gate constraints
-        assert (
-            self.A * self.pk.QL
-            + self.B * self.pk.QR
-            + self.A * self.B * self.pk.QM
-            + self.C * self.pk.QO
-            + self.PI
-            + self.pk.QC
-            == Polynomial([Scalar(0)] * group_order, Basis.LAGRANGE)
-        )
+        # Sanity check that witness fulfils gate constraints. A bad witness is
+        # still caught by the T1, T2, T3 check in round_3: the quotient would
+        # then not be a polynomial of degree < 3n
+        if self.debug:
+            assert (
+                self.A * self.pk.QL
+                + self.B * self.pk.QR
+                + self.A * self.B * self.pk.QM
+                + self.C * self.pk.QO
+                + self.PI
+                + self.pk.QC
+                == Polynomial([Scalar(0)] * group_order, Basis.LAGRANGE)
+            )
 
         # Return a_1, b_1, c_1
         return Message1(a_1, b_1, c_1)
 
     def round_2(self) -> Message2:
         group_order = self.group_order
-        setup = self.setup
 
-        roots_of_unity = Scalar.roots_of_unity(group_order)
+        roots_of_unity = self.roots_of_unity
 
         # Using A, B, C, values, and pk.S1, pk.S2, pk.S3, compute
         # Z_values for permutation grand product polynomial Z
@@ -136,54 +197,81 @@ class Prover:
         # Note the convenience function:
         #       self.rlc(val1, val2) = val_1 + self.beta * val_2 + gamma
 
-        Z_values = [Scalar(1)]
+        # Work on the raw field integers (as Polynomial.fft does) rather than on
+        # Scalar objects, so the grand product is a few tight passes over ints
+        modulus = Scalar.field_modulus
+        beta, gamma = self.beta.n, self.gamma.n
+        A_n, B_n, C_n = (
+            [x.n for x in poly.values] for poly in (self.A, self.B, self.C)
+        )
+        S1_n, S2_n, S3_n = (
+            [x.n for x in poly.values] for poly in (self.pk.S1, self.pk.S2, self.pk.S3)
+        )
+
+        # Numerator and denominator of each step of the grand product
+        num = [
+            (a + beta * w + gamma)
+            * (b + 2 * beta * w + gamma)
+            * (c + 3 * beta * w + gamma)
+            % modulus
+            for a, b, c, w in zip(A_n, B_n, C_n, (x.n for x in roots_of_unity))
+        ]
+        den = [
+            (a + beta * s1 + gamma) * (b + beta * s2 + gamma) * (c + beta * s3 + gamma)
+            % modulus
+            for a, b, c, s1, s2, s3 in zip(A_n, B_n, C_n, S1_n, S2_n, S3_n)
+        ]
+
+        # Z_i = (num_0 * ... * num_{i-1}) / (den_0 * ... * den_{i-1}). Only the
+        # full denominator product is inverted; walking backwards recovers the
+        # inverse of every prefix with one multiplication each
+        num_prod = [1]
+        den_prod = [1]
         for i in range(group_order):
-            Z_values.append(
-                self.rlc(self.A.values[i], roots_of_unity[i])
-                * self.rlc(self.B.values[i], 2 * roots_of_unity[i])
-                * self.rlc(self.C.values[i], 3 * roots_of_unity[i]) * Z_values[i] /
-                (self.rlc(self.A.values[i], self.pk.S1.values[i])
-                * self.rlc(self.B.values[i], self.pk.S2.values[i])
-                * self.rlc(self.C.values[i], self.pk.S3.values[i]))
-            )
+            num_prod.append(num_prod[i] * num[i] % modulus)
+            den_prod.append(den_prod[i] * den[i] % modulus)
 
         # Check that the last term Z_n = 1
-        assert Z_values.pop() == 1
+        assert num_prod[group_order] == den_prod[group_order]
+
+        Z_values = [Scalar(0)] * group_order
+        den_prod_inv = pow(den_prod[group_order], -1, modulus)
+        for i in reversed(range(group_order)):
+            den_prod_inv = den_prod_inv * den[i] % modulus
+            Z_values[i] = Scalar(num_prod[i] * den_prod_inv)
 
         # Sanity-check that Z was computed correctly
-        for i in range(group_order):
-            assert (
-                self.rlc(self.A.values[i], roots_of_unity[i])
-                * self.rlc(self.B.values[i], 2 * roots_of_unity[i])
-                * self.rlc(self.C.values[i], 3 * roots_of_unity[i])
-            ) * Z_values[i] - (
-                self.rlc(self.A.values[i], self.pk.S1.values[i])
-                * self.rlc(self.B.values[i], self.pk.S2.values[i])
-                * self.rlc(self.C.values[i], self.pk.S3.values[i])
-            ) * Z_values[
-                (i + 1) % group_order
-            ] == 0
+        if self.debug:
+            for i in range(group_order):
+                assert (
+                    self.rlc(self.A.values[i], roots_of_unity[i])
+                    * self.rlc(self.B.values[i], 2 * roots_of_unity[i])
+                    * self.rlc(self.C.values[i], 3 * roots_of_unity[i])
+                ) * Z_values[i] - (
+                    self.rlc(self.A.values[i], self.pk.S1.values[i])
+                    * self.rlc(self.B.values[i], self.pk.S2.values[i])
+                    * self.rlc(self.C.values[i], self.pk.S3.values[i])
+                ) * Z_values[
+                    (i + 1) % group_order
+                ] == 0
 
         # Construct Z, Lagrange interpolation polynomial for Z_values
         # Cpmpute z_1 commitment to Z polynomial
         self.Z = Polynomial(Z_values[0:group_order], Basis.LAGRANGE)
-        z_1 = setup.commit(self.Z)
+        (z_1,) = self.commit(self.Z)
 
         # Return z_1
         return Message2(z_1)
 
     def round_3(self) -> Message3:
         group_order = self.group_order
-        setup = self.setup
         fft_cofactor = self.fft_cofactor
+        # Powers of the coset offset, each computed with a single pow
+        fft_cofactor_n = fft_cofactor ** group_order
+        fft_cofactor_2n = fft_cofactor_n * fft_cofactor_n
 
         # Compute the quotient polynomial
 
-        # List of roots of unity at 4x fineness, i.e. the powers of µ
-        # where µ^(4n) = 1
-
-        ru = Scalar.root_of_unity(group_order)
-
         # Using self.fft_expand, move A, B, C into coset extended Lagrange basis
         A_big = self.fft_expand(self.A)
         B_big = self.fft_expand(self.B)
@@ -204,10 +292,10 @@ class Prover:
         # Lagrange basis
         Z_big = self.fft_expand(self.Z)
 
-        # Expand shifted Z(ωx) into coset extended Lagrange basis ?
-        Z_shift_big = self.fft_expand(Polynomial(self.Z.values[1:] + [self.Z.values[0]], Basis.LAGRANGE))
-        Z_shift_big1 = self.Z.to_coset_extended_lagrange(self.fft_cofactor * ru)
-        assert Z_shift_big == Z_shift_big1
+        # Shifted Z(ωx) in the coset extended Lagrange basis. Since ω = µ^4,
+        # evaluating at offset * ω * µ^i is the same as reading Z_big at i + 4,
+        # so reuse Z_big instead of paying for another expansion
+        Z_shift_big = Z_big.shift(4)
 
         # Expand permutation polynomials pk.S1, pk.S2, pk.S3 into coset
         # extended Lagrange basis
@@ -215,94 +303,164 @@ class Prover:
         S2_big = self.fft_expand(self.pk.S2)
         S3_big = self.fft_expand(self.pk.S3)
 
-        # Compute Z_H = X^N - 1, also in evaluation form in the coset
-        ZH_big = self.coeffs_expand(Polynomial([Scalar(-1)] + [Scalar(0)] * (group_order - 1) + [Scalar(1)], Basis.MONOMIAL), group_order)
+        # Compute Z_H = X^N - 1, also in evaluation form in the coset.
+        # Z_H(offset * µ^i) = offset^n * µ^(i*n) - 1 and µ^n is a 4th root of
+        # unity, so Z_H takes only 4 distinct values on the coset, repeating
+        # with period 4. Build those directly instead of running a 4n FFT, and
+        # invert them once, so that the quotient is a multiplication instead
+        # of a division
+        roots_of_unity_big = Scalar.roots_of_unity(group_order * 4)
+        ZH_coset = [
+            fft_cofactor_n * roots_of_unity_big[group_order * j] - 1 for j in range(4)
+        ]
+        ZH_big = Polynomial(ZH_coset * group_order, Basis.LAGRANGE)
+        ZH_inv_big = Polynomial(
+            Scalar.batch_inverse(ZH_coset) * group_order, Basis.LAGRANGE
+        )
 
-        shift_ru_big1 = self.coeffs_expand(Polynomial([Scalar(0)] + [Scalar(1)], Basis.MONOMIAL), group_order)
-        shift_ru_big2 = self.coeffs_expand(Polynomial([Scalar(0)] + [Scalar(2)], Basis.MONOMIAL), group_order)
-        shift_ru_big3 = self.coeffs_expand(Polynomial([Scalar(0)] + [Scalar(3)], Basis.MONOMIAL), group_order)
+        # X in the coset extended Lagrange basis is simply offset * µ^i, where
+        # the µ^i are the roots of unity at 4x fineness (µ^(4n) = 1), so it
+        # needs no expansion. 2X and 3X are folded into the quotient pass below
+        X_big = Polynomial(
+            [fft_cofactor * root for root in roots_of_unity_big],
+            Basis.LAGRANGE,
+        )
 
-        # < operator is not implemented so we cannot use sorted() to compare
-        assert sum(S1_big.values + S2_big.values + S3_big.values) == sum(shift_ru_big1.values + shift_ru_big2.values + shift_ru_big3.values)
-    
+        # < operator is not implemented so we cannot use sorted() to compare.
+        # X + 2X + 3X = 6X
+        if self.debug:
+            assert sum(S1_big.values + S2_big.values + S3_big.values) == sum(X_big.values) * 6
 
         # Compute L0, the Lagrange basis polynomial that evaluates to 1 at x = 1 = ω^0
         # and 0 at other roots of unity
 
-        # Expand L0 into the coset extended Lagrange basis
-        L0_big = self.fft_expand(
-            Polynomial([Scalar(1)] + [Scalar(0)] * (group_order - 1), Basis.LAGRANGE)
+        # L0(X) = (X^n - 1) / (n * (X - 1)), so in the coset extended Lagrange
+        # basis it follows from Z_H and X with one batch inversion, instead of
+        # an IFFT and a coset FFT
+        L0_big = Polynomial(
+            [
+                zh * inv
+                for zh, inv in zip(
+                    ZH_big.values,
+                    Scalar.batch_inverse(
+                        [(x - 1) * group_order for x in X_big.values]
+                    ),
+                )
+            ],
+            Basis.LAGRANGE,
         )
         # Compute the quotient polynomial (called T(x) in the paper)
         # It is only possible to construct this polynomial if the following
-        # equations are true at all roots of unity {1, w ... w^(n-1)}:
-        # 1. All gates are correct:
-        #    A * QL + B * QR + A * B * QM + C * QO + PI + QC = 0
-        P0 = A_big * QL_big + B_big * QR_big + A_big * B_big * QM_big + C_big * QO_big + PI_big + QC_big
-        # 2. The permutation accumulator is valid:
-        #    Z(wx) = Z(x) * (rlc of A, X, 1) * (rlc of B, 2X, 1) *
-        #                   (rlc of C, 3X, 1) / (rlc of A, S1, 1) /
-        #                   (rlc of B, S2, 1) / (rlc of C, S3, 1)
-        #    rlc = random linear combination: term_1 + beta * term2 + gamma * term3
-        P1 = Z_big * self.rlc(A_big, shift_ru_big1) * self.rlc(B_big, shift_ru_big2) * self.rlc(C_big, shift_ru_big3) - Z_shift_big * self.rlc(A_big, S1_big) * self.rlc(B_big, S2_big) * self.rlc(C_big, S3_big)
-        # 3. The permutation accumulator equals 1 at the start point
-        #    (Z - 1) * L0 = 0
-        #    L0 = Lagrange polynomial, equal at all roots of unity except 1
-        P2 = (Z_big - Scalar(1)) * L0_big
-
-        QUOT_big = (P0 + P1 * self.alpha + P2 * self.alpha ** 2) / ZH_big
+        # equations are true at all roots of unity {1, w ... w^(n-1)}.
+        #
+        # All three are evaluated in a single fused pass over the raw field
+        # integers at each of the 4n coset points, rather than materializing
+        # a new 4n-sized Polynomial for every + and *
+        modulus = Scalar.field_modulus
+        beta, gamma = self.beta.n, self.gamma.n
+        alpha = self.alpha.n
+        alpha2 = alpha * alpha % modulus
+        columns = [
+            [x.n for x in poly.values]
+            for poly in (
+                A_big, B_big, C_big, PI_big,
+                QL_big, QR_big, QM_big, QO_big, QC_big,
+                Z_big, Z_shift_big, S1_big, S2_big, S3_big,
+                X_big, L0_big,
+                ZH_inv_big,
+            )
+        ]
+        QUOT_values = []
+        for (
+            a, b, c, pi,
+            ql, qr, qm, qo, qc,
+            z, z_shift, s1, s2, s3,
+            x, l0,
+            zh_inv,
+        ) in zip(*columns):
+            # 1. All gates are correct:
+            #    A * QL + B * QR + A * B * QM + C * QO + PI + QC = 0
+            p0 = (a * ql + b * qr + a * b * qm + c * qo + pi + qc) % modulus
+            # 2. The permutation accumulator is valid:
+            #    Z(wx) = Z(x) * (rlc of A, X, 1) * (rlc of B, 2X, 1) *
+            #                   (rlc of C, 3X, 1) / (rlc of A, S1, 1) /
+            #                   (rlc of B, S2, 1) / (rlc of C, S3, 1)
+            #    rlc = random linear combination: term_1 + beta * term2 + gamma * term3
+            p1 = (
+                z
+                * (a + beta * x + gamma)
+                * (b + 2 * beta * x + gamma)
+                * (c + 3 * beta * x + gamma)
+                - z_shift
+                * (a + beta * s1 + gamma)
+                * (b + beta * s2 + gamma)
+                * (c + beta * s3 + gamma)
+            ) % modulus
+            # 3. The permutation accumulator equals 1 at the start point
+            #    (Z - 1) * L0 = 0
+            #    L0 = Lagrange polynomial, equal at all roots of unity except 1
+            p2 = (z - 1) * l0 % modulus
+            QUOT_values.append(Scalar((p0 + alpha * p1 + alpha2 * p2) * zh_inv))
+
+        QUOT_big = Polynomial(QUOT_values, Basis.LAGRANGE)
+
+        # Only the quotient is needed from here on. Release the 4n-sized
+        # expansions now instead of holding them (about 20 * 4n field elements,
+        # plus their integer copies) through the split and the commitments
+        del columns
+        del A_big, B_big, C_big, PI_big
+        del QL_big, QR_big, QM_big, QO_big, QC_big
+        del Z_big, Z_shift_big, S1_big, S2_big, S3_big
+        del ZH_big, ZH_inv_big, X_big, L0_big
 
         # Sanity check: QUOT has degree < 3n
-        assert (
-            self.expanded_evals_to_coeffs(QUOT_big).values[-group_order:]
-            == [0] * group_order
-        )
+        if self.debug:
+            assert (
+                self.expanded_evals_to_coeffs(QUOT_big).values[-group_order:]
+                == [0] * group_order
+            )
         print("Generated the quotient polynomial")
 
         # Split up T into T1, T2 and T3 (needed because T has degree 3n - 4, so is
         # too big for the trusted setup)
         T = self.expanded_evals_to_coeffs(QUOT_big)
-        T1 = Polynomial(T.values[0:group_order], Basis.MONOMIAL).fft()
-        T2 = Polynomial(T.values[group_order:2*group_order], Basis.MONOMIAL).fft()
-        T3 = Polynomial(T.values[2*group_order:3*group_order], Basis.MONOMIAL).fft()
+        # These stay in the monomial basis: that is what the commitment needs
+        T1 = Polynomial(T.values[0:group_order], Basis.MONOMIAL)
+        T2 = Polynomial(T.values[group_order:2*group_order], Basis.MONOMIAL)
+        T3 = Polynomial(T.values[2*group_order:3*group_order], Basis.MONOMIAL)
+        del T
 
-        self.T = T
         self.T1 = T1
         self.T2 = T2
         self.T3 = T3
 
         # Sanity check that we've computed T1, T2, T3 correctly
         assert (
-            T1.barycentric_eval(fft_cofactor)
-            + T2.barycentric_eval(fft_cofactor) * fft_cofactor**group_order
-            + T3.barycentric_eval(fft_cofactor) * fft_cofactor ** (group_order * 2)
+            T1.coeffs_eval(fft_cofactor)
+            + T2.coeffs_eval(fft_cofactor) * fft_cofactor_n
+            + T3.coeffs_eval(fft_cofactor) * fft_cofactor_2n
         ) == QUOT_big.values[0]
+        del QUOT_big, QUOT_values
 
         print("Generated T1, T2, T3 polynomials")
 
         # Compute commitments t_lo_1, t_mid_1, t_hi_1 to T1, T2, T3 polynomials
 
-        t_lo_1 = setup.commit(T1)
-        t_mid_1 = setup.commit(T2)
-        t_hi_1 = setup.commit(T3)
+        t_lo_1, t_mid_1, t_hi_1 = self.commit(T1, T2, T3)
 
         # Return t_lo_1, t_mid_1, t_hi_1
         return Message3(t_lo_1, t_mid_1, t_hi_1)
 
     def round_4(self) -> Message4:
         # Compute evaluations to be used in constructing the linearization polynomial.
-        ru = Scalar.root_of_unity(self.group_order)
-
-        # Compute a_eval = A(zeta)
-        a_eval = self.A.barycentric_eval(self.zeta)
-        # Compute b_eval = B(zeta)
-        b_eval = self.B.barycentric_eval(self.zeta)
-        # Compute c_eval = C(zeta)
-        c_eval = self.C.barycentric_eval(self.zeta)
-        # Compute s1_eval = pk.S1(zeta)
-        s1_eval = self.pk.S1.barycentric_eval(self.zeta)
-        # Compute s2_eval = pk.S2(zeta)
-        s2_eval = self.pk.S2.barycentric_eval(self.zeta)
+        ru = self.ru
+
+        # Compute a_eval = A(zeta), b_eval = B(zeta), c_eval = C(zeta),
+        # s1_eval = pk.S1(zeta) and s2_eval = pk.S2(zeta), sharing the
+        # barycentric weights at zeta
+        a_eval, b_eval, c_eval, s1_eval, s2_eval = Polynomial.barycentric_eval_batch(
+            [self.A, self.B, self.C, self.pk.S1, self.pk.S2], self.zeta
+        )
         # Compute z_shifted_eval = Z(zeta * ω)
         z_shifted_eval = self.Z.barycentric_eval(self.zeta * ru)
 
@@ -312,16 +470,22 @@ class Prover:
 
     def round_5(self) -> Message5:
         group_order = self.group_order
-        ru = Scalar.root_of_unity(group_order)
-        setup = self.setup
+        roots_of_unity = self.roots_of_unity
+        ru = self.ru
 
         zeta = self.zeta
 
-        # Evaluate the Lagrange basis polynomial L0 at zeta
-        L0_zeta = Polynomial([Scalar(1)] + [Scalar(0)] * (group_order - 1), Basis.LAGRANGE).barycentric_eval(zeta)
+        # Evaluate the Lagrange basis polynomial L0 and the public inputs
+        # polynomial PI at zeta
+        L0_zeta, PI_zeta = Polynomial.barycentric_eval_batch(
+            [Polynomial([Scalar(1)] + [Scalar(0)] * (group_order - 1), Basis.LAGRANGE), self.PI],
+            zeta,
+        )
 
         # Evaluate the vanishing polynomial Z_H(X) = X^n - 1 at zeta
-        ZH_zeta = (zeta ** group_order) - Scalar(1)
+        zeta_n = zeta ** group_order
+        zeta_2n = zeta_n * zeta_n
+        ZH_zeta = zeta_n - Scalar(1)
 
         # Compute the "linearization polynomial" R. This is a clever way to avoid
         # needing to provide evaluations of _all_ the polynomials that we are
@@ -337,20 +501,55 @@ class Prover:
         # proof item once; any further multiplicands in each term need to be
         # replaced with their evaluations at Z, which do still need to be provided
 
-        A_zeta = self.A.barycentric_eval(zeta)
-        B_zeta = self.B.barycentric_eval(zeta)
-        C_zeta = self.C.barycentric_eval(zeta)
-        Z_shift_zeta = self.Z.barycentric_eval(zeta * ru)
-        S1_zeta = self.pk.S1.barycentric_eval(zeta)
-        S2_zeta = self.pk.S2.barycentric_eval(zeta)
-        P0_zeta = self.pk.QL * A_zeta + self.pk.QR * B_zeta + self.pk.QM * (A_zeta * B_zeta) + self.pk.QO * C_zeta + self.PI.barycentric_eval(zeta) + self.pk.QC
-        P1_zeta = self.Z * self.rlc(A_zeta, zeta) * self.rlc(B_zeta, zeta * 2) * self.rlc(C_zeta, zeta * 3) - self.rlc1(C_zeta, self.pk.S3) * Z_shift_zeta * self.rlc(A_zeta, S1_zeta) * self.rlc(B_zeta, S2_zeta)
-        P2_zeta =  (self.Z - Scalar(1)) * L0_zeta
-        RHS_zeta = (self.T1 + self.T2 * zeta ** group_order + self.T3 * zeta ** (group_order * 2)) * ZH_zeta
-        R = P0_zeta + P1_zeta * self.alpha + P2_zeta * self.alpha ** 2 - RHS_zeta
-
-        # Commit to R
-        R_commit = setup.commit(R)
+        # The evaluations at zeta were already computed in round 4
+        A_zeta = self.msg4.a_eval
+        B_zeta = self.msg4.b_eval
+        C_zeta = self.msg4.c_eval
+        Z_shift_zeta = self.msg4.z_shifted_eval
+        S1_zeta = self.msg4.s1_eval
+        S2_zeta = self.msg4.s2_eval
+        # T1, T2, T3 are kept as coefficients, so combine them first and only
+        # move the combination into the Lagrange basis
+        T_zeta = (self.T1 + self.T2 * zeta_n + self.T3 * zeta_2n).fft()
+
+        # As in round_3, R = P0 + alpha * P1 + alpha^2 * P2 - T * Z_H(zeta) is
+        # built in a single pass over the raw field integers, rather than
+        # allocating a new Polynomial for every intermediate + and *, where
+        #   P0 = QL * a + QR * b + QM * a * b + QO * c + PI(zeta) + QC
+        #   P1 = Z * (rlc of a, zeta) * (rlc of b, 2 zeta) * (rlc of c, 3 zeta)
+        #        - (rlc of c, S3) * z_shifted_eval * (rlc of a, s1) * (rlc of b, s2)
+        #   P2 = (Z - 1) * L0(zeta)
+        modulus = Scalar.field_modulus
+        beta, gamma = self.beta.n, self.gamma.n
+        alpha = self.alpha.n
+        alpha2 = alpha * alpha % modulus
+        a, b, c = A_zeta.n, B_zeta.n, C_zeta.n
+        ab = a * b % modulus
+        pi, l0, zh = PI_zeta.n, L0_zeta.n, ZH_zeta.n
+        z_coeff = (
+            self.rlc(A_zeta, zeta) * self.rlc(B_zeta, zeta * 2) * self.rlc(C_zeta, zeta * 3)
+        ).n
+        s3_coeff = (
+            Z_shift_zeta * self.rlc(A_zeta, S1_zeta) * self.rlc(B_zeta, S2_zeta)
+        ).n
+        columns = [
+            [x.n for x in poly.values]
+            for poly in (
+                self.pk.QL, self.pk.QR, self.pk.QM, self.pk.QO, self.pk.QC,
+                self.Z, self.pk.S3, T_zeta,
+            )
+        ]
+        R_values = [
+            (
+                ql * a + qr * b + qm * ab + qo * c + pi + qc
+                + alpha * (z * z_coeff - (c + beta * s3 + gamma) * s3_coeff)
+                + alpha2 * (z - 1) * l0
+                - t * zh
+            )
+            % modulus
+            for ql, qr, qm, qo, qc, z, s3, t in zip(*columns)
+        ]
+        R = Polynomial([Scalar(r) for r in R_values], Basis.LAGRANGE)
 
         # Sanity-check R
         assert R.barycentric_eval(zeta) == 0
@@ -380,17 +579,41 @@ class Prover:
 
         # TODO: why not test onces?
         v = self.v
-        D_z = Polynomial([Scalar(-zeta), Scalar(1)] + [Scalar(0)] * (group_order - 2), Basis.MONOMIAL).fft()
-        W_z = ((R + (self.A - A_zeta) * v + (self.B - B_zeta) * v ** 2 + (self.C - C_zeta) * v ** 3 + (self.pk.S1 - S1_zeta) * v ** 4 + (self.pk.S2 - S2_zeta) * v ** 5) / D_z)
-
-        # Check that degree of W_z is not greater than n
-        R_z_big = Polynomial(R.ifft().values + [Scalar(0)] * (3 * group_order), Basis.MONOMIAL).fft()
-        D_z_big = Polynomial([Scalar(-zeta), Scalar(1)] + [Scalar(0)] * (4 * group_order - 2), Basis.MONOMIAL).fft()
-        W_z_coeffs = (R_z_big / D_z_big).ifft().values
-        assert W_z_coeffs[group_order:] == [0] * (group_order * 3)
+        # X - zeta in the Lagrange basis is just ω^i - zeta, no FFT needed
+        D_z = Polynomial([root - zeta for root in roots_of_unity], Basis.LAGRANGE)
+        # The numerator is again accumulated in one pass over the field integers
+        v1 = v.n
+        v2 = v1 * v1 % modulus
+        v3 = v2 * v1 % modulus
+        v4 = v3 * v1 % modulus
+        v5 = v4 * v1 % modulus
+        s1, s2 = S1_zeta.n, S2_zeta.n
+        columns = [
+            [x.n for x in poly.values]
+            for poly in (self.A, self.B, self.C, self.pk.S1, self.pk.S2)
+        ]
+        W_z_numerator = Polynomial(
+            [
+                Scalar(
+                    (
+                        r
+                        + v1 * (a_i - a)
+                        + v2 * (b_i - b)
+                        + v3 * (c_i - c)
+                        + v4 * (s1_i - s1)
+                        + v5 * (s2_i - s2)
+                    )
+                    % modulus
+                )
+                for r, a_i, b_i, c_i, s1_i, s2_i in zip(R_values, *columns)
+            ],
+            Basis.LAGRANGE,
+        )
+        W_z = W_z_numerator / D_z
+        del columns, R_values, W_z_numerator, D_z
 
-        # Compute W_z_1 commitment to W_z
-        W_z_1 = setup.commit(W_z)
+        # No separate degree check on W_z is needed: R(zeta) == 0 was asserted
+        # above, so R is divisible by (X - zeta), as are the (P - P(zeta)) terms
 
         # Generate proof that the provided evaluation of Z(z*w) is correct. This
         # awkwardly different term is needed because the permutation accumulator
@@ -398,20 +621,35 @@ class Prover:
         # coordinates, and not just within one coordinate.
         # In other words: Compute W_zw = (Z - z_shifted_eval) / (X - zeta * ω)
 
-        D_shift_z = Polynomial([Scalar(-zeta * ru), Scalar(1)] + [Scalar(0)] * (group_order - 2), Basis.MONOMIAL).fft()
+        zeta_ru = zeta * ru
+        D_shift_z = Polynomial([root - zeta_ru for root in roots_of_unity], Basis.LAGRANGE)
         W_zw = (self.Z - Z_shift_zeta) / D_shift_z
 
         # Check that degree of W_z is not greater than n
         # assert W_zw_coeffs[group_order:] == [0] * (group_order * 3)
 
-        # Compute W_z_1 commitment to W_z
-        W_zw_1 = setup.commit(W_zw)
+        # Compute W_z_1, W_zw_1 commitments to W_z, W_zw
+        W_z_1, W_zw_1 = self.commit(W_z, W_zw)
 
         print("Generated final quotient witness polynomials")
 
         # Return W_z_1, W_zw_1
         return Message5(W_z_1, W_zw_1)
 
+    def commit(self, *polys: Polynomial) -> list[G1Point]:
+        if self.executor is None:
+            return [self.setup.commit(poly) for poly in polys]
+        return list(self.executor.map(_commit_in_worker, polys))
+
+    # Lagrange-basis polynomial equal to the given values at the first roots of
+    # unity and to 0 at the rest. Scalars are immutable, so all of the padding
+    # can reference a single zero instead of allocating one per slot
+    def pad_lagrange(self, values: list[Scalar]) -> Polynomial:
+        assert len(values) <= self.group_order
+        return Polynomial(
+            values + [Scalar(0)] * (self.group_order - len(values)), Basis.LAGRANGE
+        )
+
     def fft_expand(self, x: Polynomial):
         return x.to_coset_extended_lagrange(self.fft_cofactor)
     
@@ -423,6 +661,3 @@ class Prover:
 
     def rlc(self, term_1, term_2):
         return term_1 + term_2 * self.beta + self.gamma
-
-    def rlc1(self, term_1, term_2):
-        return term_2 * self.beta + term_1 + self.gamma
@@ -62,14 +62,17 @@ class Setup(object):
         # print("X^1 points checked consistent")
         return cls(powers_of_x, X2)
 
-    # Encodes the KZG commitment that evaluates to the given values in the group
+    # Encodes the KZG commitment that evaluates to the given values in the group.
+    # Polynomials already in the monomial basis are committed to directly
     def commit(self, values: Polynomial) -> G1Point:
-        assert values.basis == Basis.LAGRANGE
-
-        # Run inverse FFT to convert values from Lagrange basis to monomial basis
+        # Values in the Lagrange basis are converted to monomial coefficients
+        # with an inverse FFT; monomial input is used as is
         # Optional: Check values size does not exceed maximum power setup can handle
-        # Compute linear combination of setup with values
-        coeffs = values.ifft()
+        # Compute linear combination of setup with the coefficients
+        if values.basis == Basis.LAGRANGE:
+            coeffs = values.ifft()
+        else:
+            coeffs = values
         return ec_lincomb([(x, y) for x, y in zip(self.powers_of_x, coeffs.values)])
 
     # Generate the verification key for this program with the given setup
@@ -26,6 +26,8 @@ def setup_test():
             3125847109934958347271782137825877642397632921923926105820408033549219695465,
         )
     )
+    # Committing to the same polynomial in the monomial basis gives the same point
+    assert setup.commit(dummy_values.ifft()) == commitment
     vk = setup.verification_key(program.common_preprocessed_input())
     assert (
         vk.w
@@ -109,6 +111,15 @@ def prover_test_dummy_verifier(setup):
     prover = Prover(setup, program)
     proof = prover.prove(assignments)
 
+    # Run the prover's debug-only sanity checks too; they must not change the proof
+    debug_proof = Prover(setup, program, debug=True).prove(assignments)
+    assert debug_proof.flatten() == proof.flatten()
+
+    # Committing in worker processes must give the same proof as committing
+    # serially, whatever the number of CPUs on the machine running the tests
+    pool_proof = Prover(setup, program, commit_workers=3).prove(assignments)
+    assert pool_proof.flatten() == proof.flatten()
+
     print("Beginning test verification")
     program = Program(["e public", "c <== a * b", "e <== c * d"], 8)
     public = [60]